@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+import numpy as np
+
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "zotero_arxiv")
+
+
+def cache_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, name)
+
+
+def load_json(name: str) -> Optional[Any]:
+    """
+    Read a JSON file from the cache directory; returns None if missing or unreadable.
+    """
+    try:
+        with open(cache_path(name), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(name: str, data: Any) -> None:
+    """
+    Atomically write `data` as JSON into the cache directory.
+    Failures are ignored: the cache is an optimization, never a requirement.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, cache_path(name))
+    except OSError as exc:
+        print(f"Failed to write cache {name}: {exc}")
+
+
+def load_npy(name: str) -> Optional[np.ndarray]:
+    try:
+        return np.load(cache_path(name), allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+
+def save_npy(name: str, array: np.ndarray) -> None:
+    """
+    Atomically write `array` as .npy into the cache directory (best effort, like `save_json`).
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, array, allow_pickle=False)
+        os.replace(tmp_path, cache_path(name))
+    except OSError as exc:
+        print(f"Failed to write cache {name}: {exc}")
@@ -1,7 +1,29 @@
+import contextlib
 import json
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+
+_LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1", "0.0.0.0"})
+
+_TRANSLATE_PROMPT = "请将以下摘要翻译为{target_lang}，直译为主，保持术语准确，避免添加说明，直接输出译文：\n\n{text}"
+_SUMMARY_PROMPT = (
+    "用{target_lang}写一个精炼 TLDR（约{max_words}词），突出任务、方法、关键贡献与主要结果，避免口水话：\n"
+    "标题: {title}\n"
+    "摘要: {abstract}"
+)
+_TRANSLATE_SUMMARY_PROMPT = (
+    "请基于下面的论文完成两项任务：\n"
+    "1. abstract_zh：将摘要翻译为{target_lang}，直译为主，保持术语准确，避免添加说明。\n"
+    "2. tldr：用{tldr_lang}写一个精炼 TLDR（约{max_words}词），突出任务、方法、关键贡献与主要结果，避免口水话。\n"
+    "标题: {title}\n"
+    "摘要: {abstract}\n\n"
+    "输出严格的 JSON（仅一行）：\n"
+    '{{"abstract_zh": "译文", "tldr": "TLDR"}}'
+)
 
 
 class LLMScorer:
@@ -11,8 +33,31 @@ class LLMScorer:
 
     def __init__(self, api_key: str, base_url: str, model: str, temperature: float = 0.0):
         self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.api_key = api_key
+        self.base_url = base_url
+        # Set only inside `async_session`: its pooled connections are bound to one event loop.
+        self.aclient: Optional[AsyncOpenAI] = None
         self.model = model
         self.temperature = temperature
+        # Self-hosted servers (vLLM, llama.cpp, ...) batch concurrent requests and have no RPM limits.
+        self.is_local = urlparse(base_url or "").hostname in _LOCAL_HOSTS
+
+    @contextlib.asynccontextmanager
+    async def async_session(self) -> AsyncIterator["LLMScorer"]:
+        """
+        Open an async client on the running event loop for the `a*` methods, closed on exit.
+        HTTP/2 lets the concurrent enrichment calls multiplex over a single connection.
+        """
+        async with AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=httpx.AsyncClient(http2=True),
+        ) as aclient:
+            self.aclient = aclient
+            try:
+                yield self
+            finally:
+                self.aclient = None
 
     def score(self, paper: Dict[str, Any], query: str) -> Dict[str, Any]:
         """
@@ -62,48 +107,142 @@ class LLMScorer:
             # Fall back to a conservative default when parsing fails
             return {"match": False, "score": 0.0, "reason": "Failed to parse LLM response"}
 
-    def translate(self, text: str, target_lang: str = "Chinese") -> str:
+    @staticmethod
+    def _translate_messages(text: str, target_lang: str) -> List[Dict[str, str]]:
+        prompt = _TRANSLATE_PROMPT.format(target_lang=target_lang, text=text)
+        return [
+            {"role": "system", "content": "You are a concise scientific translator."},
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    def _summary_messages(title: str, abstract: str, target_lang: str, max_words: int) -> List[Dict[str, str]]:
+        prompt = _SUMMARY_PROMPT.format(
+            target_lang=target_lang, max_words=max_words, title=title, abstract=abstract
+        )
+        return [
+            {"role": "system", "content": "You are a sharp academic summarizer."},
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    def _translate_summary_messages(
+        title: str, abstract: str, target_lang: str, tldr_lang: str, max_words: int
+    ) -> List[Dict[str, str]]:
+        prompt = _TRANSLATE_SUMMARY_PROMPT.format(
+            target_lang=target_lang, tldr_lang=tldr_lang, max_words=max_words, title=title, abstract=abstract
+        )
+        return [
+            {
+                "role": "system",
+                "content": "You are a concise scientific translator and sharp academic summarizer. Keep output as JSON only.",
+            },
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    def _parse_translate_summary(content: str) -> Optional[Dict[str, str]]:
         """
-        Translate a chunk of text using the same LLM endpoint.
+        Both fields from the fused JSON reply, or None (caller falls back to separate calls)
+        unless it is an object whose `abstract_zh` and `tldr` are non-empty strings.
         """
-        if not text:
-            return ""
-        prompt = (
-            f"请将以下摘要翻译为{target_lang}，直译为主，保持术语准确，避免添加说明，直接输出译文：\n\n{text}"
-        )
+        try:
+            parsed = json.loads(content)
+        except ValueError:
+            return None
+        if not isinstance(parsed, dict):
+            return None
+        fields = {key: parsed.get(key) for key in ("abstract_zh", "tldr")}
+        if not all(isinstance(value, str) and value.strip() for value in fields.values()):
+            return None
+        return {key: value.strip() for key, value in fields.items()}
+
+    def _complete(self, messages: List[Dict[str, str]], **kwargs: Any) -> str:
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a concise scientific translator."},
-                    {"role": "user", "content": prompt},
-                ],
+                messages=messages,
                 temperature=self.temperature,
+                **kwargs,
             )
             return response.choices[0].message.content.strip()
         except Exception:
             return ""
 
-    def summarize(self, title: str, abstract: str, target_lang: str = "Chinese", max_words: int = 80) -> str:
-        """
-        Generate a brief TLDR in the target language.
-        """
-        if not abstract:
-            return ""
-        prompt = (
-            f"用{target_lang}写一个精炼 TLDR（约{max_words}词），突出任务、方法、关键贡献与主要结果，避免口水话：\n"
-            f"标题: {title}\n"
-            f"摘要: {abstract}"
-        )
+    async def _acomplete(self, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        if self.aclient is None:
+            raise RuntimeError("LLMScorer async methods must run inside `async with scorer.async_session()`")
         try:
-            response = self.client.chat.completions.create(
+            response = await self.aclient.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a sharp academic summarizer."},
-                    {"role": "user", "content": prompt},
-                ],
+                messages=messages,
                 temperature=self.temperature,
+                **kwargs,
             )
             return response.choices[0].message.content.strip()
         except Exception:
             return ""
+
+    def translate(self, text: str, target_lang: str = "Chinese") -> str:
+        """
+        Translate a chunk of text using the same LLM endpoint.
+        """
+        if not text:
+            return ""
+        return self._complete(self._translate_messages(text, target_lang))
+
+    async def atranslate(self, text: str, target_lang: str = "Chinese") -> str:
+        """
+        Async variant of `translate`, used for concurrent enrichment.
+        """
+        if not text:
+            return ""
+        return await self._acomplete(self._translate_messages(text, target_lang))
+
+    def summarize(self, title: str, abstract: str, target_lang: str = "Chinese", max_words: int = 80) -> str:
+        """
+        Generate a brief TLDR in the target language.
+        """
+        if not abstract:
+            return ""
+        return self._complete(self._summary_messages(title, abstract, target_lang, max_words))
+
+    async def asummarize(
+        self, title: str, abstract: str, target_lang: str = "Chinese", max_words: int = 80
+    ) -> str:
+        """
+        Async variant of `summarize`, used for concurrent enrichment.
+        """
+        if not abstract:
+            return ""
+        return await self._acomplete(self._summary_messages(title, abstract, target_lang, max_words))
+
+    async def atranslate_and_summarize(
+        self,
+        title: str,
+        abstract: str,
+        target_lang: str = "Chinese",
+        tldr_lang: str = "Chinese",
+        max_words: int = 80,
+    ) -> Dict[str, str]:
+        """
+        Translate the abstract and write a TLDR in one JSON-mode call, used for concurrent enrichment.
+        Returns `abstract_zh` and `tldr`; falls back to two separate calls if the model replied with
+        unusable JSON. A failed request (empty content) is not retried, so an erroring provider sees one call.
+        The fallback calls run one after another, so the caller's concurrency permit covers a single request.
+        """
+        if not abstract:
+            return {"abstract_zh": "", "tldr": ""}
+        content = await self._acomplete(
+            self._translate_summary_messages(title, abstract, target_lang, tldr_lang, max_words),
+            response_format={"type": "json_object"},
+        )
+        if not content:
+            return {"abstract_zh": "", "tldr": ""}
+        parsed = self._parse_translate_summary(content)
+        if parsed is None:
+            parsed = {
+                "abstract_zh": await self.atranslate(abstract, target_lang=target_lang),
+                "tldr": await self.asummarize(title, abstract, target_lang=tldr_lang, max_words=max_words),
+            }
+        return parsed
@@ -1,14 +1,35 @@
+import asyncio
+import copy
+import hashlib
+import logging
 import os
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import yaml
+from sentence_transformers import SentenceTransformer
 
 from arxiv_fetcher import fetch_daily_arxiv
+from cache_utils import load_json, load_npy, save_json, save_npy
 from feishu import build_post_content, post_to_feishu
 from wechat import post_papers_separately
 from llm_utils import LLMScorer
-from similarity import rerank_by_embedding
-from zotero_client import fetch_papers
+from similarity import encode_abstracts, load_model, rerank_by_embedding
+from zotero_client import changed_item_keys, fetch_papers, library_version
+
+_CORPUS_CACHE_FILE = "corpus.json"
+_CORPUS_EMB_CACHE_FILE = "corpus_emb.npy"
+
+
+def _emb_digest(emb: np.ndarray) -> str:
+    """
+    Fingerprint of an embedding matrix; stored in corpus.json to pair it with corpus_emb.npy.
+    """
+    digest = hashlib.sha1(str((emb.shape, emb.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(emb).tobytes())
+    return digest.hexdigest()
 
 
 def load_config(path: str = "config.yaml") -> Dict:
@@ -16,6 +37,12 @@ def load_config(path: str = "config.yaml") -> Dict:
         raise FileNotFoundError(
             f"Config file {path} not found. Copy config.example.yaml and fill in your settings."
         )
+    # Cached per (path, mtime); hand out a copy so callers can't mutate the cached config.
+    return copy.deepcopy(_load_config_cached(path, os.path.getmtime(path)))
+
+
+@lru_cache(maxsize=4)
+def _load_config_cached(path: str, mtime: float) -> Dict:
     with open(path, "r", encoding="utf-8") as file:
         cfg = yaml.safe_load(file) or {}
 
@@ -71,6 +98,7 @@ def load_config(path: str = "config.yaml") -> Dict:
     cfg["embedding"].setdefault("model", "avsolatorio/GIST-small-Embedding-v0")
     cfg["llm"].setdefault("temperature", 0.0)
     cfg["llm"].setdefault("base_url", "https://api.openai.com/v1")
+    cfg["llm"].setdefault("max_concurrency", 12)
 
     # 检查通知方式：至少需要配置飞书或企业微信之一
     has_feishu = bool(cfg.get("feishu", {}).get("webhook_url"))
@@ -93,56 +121,205 @@ def load_config(path: str = "config.yaml") -> Dict:
     return cfg
 
 
-def enrich_with_llm(papers: List[Dict], scorer: LLMScorer, query: Dict[str, str]) -> List[Dict]:
+def load_zotero_corpus(
+    config: Dict, get_model: Optional[Callable[[], SentenceTransformer]] = None
+) -> Tuple[List[Dict], Optional[np.ndarray]]:
+    """
+    Load the Zotero corpus and its embeddings, reusing the on-disk cache when possible.
+
+    The cache is keyed on library/filters/model and stamped with the Zotero library version:
+    an unchanged library is served straight from disk, otherwise only items modified since
+    the cached version are fetched (or the capped list is refetched) and only new items are
+    embedded, so the result always matches a fresh full fetch. `get_model` supplies the embedding model
+    (e.g. a future's `result`) and is only called when something needs encoding.
+    """
+    zotero_cfg = config["zotero"]
+    max_items = int(zotero_cfg["max_items"]) if zotero_cfg.get("max_items") is not None else None
+    max_corpus = int(config["query"]["max_corpus"]) if config["query"].get("max_corpus") else None
+    model_name = config["embedding"]["model"]
+    conn = dict(
+        library_id=zotero_cfg["library_id"],
+        api_key=zotero_cfg["api_key"],
+        library_type=zotero_cfg["library_type"],
+    )
+    signature = {
+        "library_id": str(zotero_cfg["library_id"]),
+        "library_type": zotero_cfg["library_type"],
+        "item_types": list(zotero_cfg["item_types"]),
+        "max_items": max_items,
+        "max_corpus": max_corpus,
+        "model": model_name,
+    }
+
+    version = library_version(**conn)
+    cached = load_json(_CORPUS_CACHE_FILE)
+    cached_emb = load_npy(_CORPUS_EMB_CACHE_FILE) if cached else None
+    usable = (
+        cached is not None
+        and cached.get("signature") == signature
+        and cached_emb is not None
+        and len(cached_emb) == len(cached.get("papers", []))
+        # Guards against a run that died between the two writes: new matrix, old paper list.
+        and cached.get("emb_digest") == _emb_digest(cached_emb)
+    )
+    if usable and cached.get("version") == version:
+        print(f"Zotero library unchanged (version {version}); using cached corpus.")
+        return cached["papers"], cached_emb
+
+    known: Dict[str, np.ndarray] = {}
+    papers: Optional[List[Dict]] = None
+    if usable:
+        changed = changed_item_keys(**conn, since=cached["version"])
+        # Embeddings of unchanged papers are reused by key whichever way the list is rebuilt.
+        known = {
+            p["key"]: row for p, row in zip(cached["papers"], cached_emb) if p["key"] not in changed
+        }
+        # `max_items` caps raw Zotero items (entries without an abstract use up slots), so only
+        # a capped fetch reproduces it; that is a single page anyway. Without it, merge the delta.
+        if not max_items:
+            delta = fetch_papers(**conn, item_types=zotero_cfg["item_types"], since=cached["version"])
+            delta_keys = {p["key"] for p in delta}
+            dropped = any(p["key"] in changed and p["key"] not in delta_keys for p in cached["papers"])
+            # The cache holds only the top `max_corpus` papers: a dropped one leaves a gap that
+            # only a full fetch can refill.
+            if not (dropped and max_corpus):
+                papers = [p for p in cached["papers"] if p["key"] in known] + delta
+                papers.sort(key=lambda p: p.get("date_added", ""), reverse=True)
+                print(f"Zotero library changed since version {cached['version']}: {len(delta)} updated papers.")
+    if papers is None:
+        papers = fetch_papers(**conn, item_types=zotero_cfg["item_types"], max_items=max_items)
+        if known:
+            print(f"Refetched Zotero corpus; reusing {len(known)} cached embeddings.")
+    for limit in (max_items, max_corpus):
+        if limit:
+            papers = papers[:limit]
+    if not papers:
+        return papers, None
+
+    missing = [p for p in papers if p["key"] not in known]
+    if missing:
+        model = get_model() if get_model else None
+        known.update(zip([p["key"] for p in missing], encode_abstracts(model_name, missing, model=model)))
+    corpus_emb = np.stack([known[p["key"]] for p in papers])
+
+    # The JSON goes last and names the matrix it belongs to, so a partial write is detected on load.
+    save_npy(_CORPUS_EMB_CACHE_FILE, corpus_emb)
+    save_json(
+        _CORPUS_CACHE_FILE,
+        {
+            "signature": signature,
+            "version": version,
+            "emb_digest": _emb_digest(corpus_emb),
+            "papers": papers,
+        },
+    )
+    return papers, corpus_emb
+
+
+def _is_cjk(text: str, threshold: float = 0.3) -> bool:
+    """
+    Whether `text` is mostly Chinese (share of CJK ideographs above `threshold`).
+    """
+    if not text:
+        return False
+    cjk = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    return cjk / len(text) > threshold
+
+
+def enrich_with_llm(
+    papers: List[Dict], scorer: LLMScorer, query: Dict[str, str], max_concurrency: int = 12
+) -> List[Dict]:
+    return asyncio.run(aenrich_with_llm(papers, scorer, query, max_concurrency=max_concurrency))
+
+
+async def aenrich_with_llm(
+    papers: List[Dict], scorer: LLMScorer, query: Dict[str, str], max_concurrency: int = 12
+) -> List[Dict]:
+    """
+    Enrich papers with translations/TLDRs, issuing LLM calls concurrently.
+    At most `max_concurrency` requests are in flight to stay under provider rate limits;
+    the cap is lifted for local endpoints.
+    """
     translate_abstract = bool(query.get("translate_abstract", True))
     include_abstract = bool(query.get("include_abstract", True))
     include_tldr = bool(query.get("include_tldr", True))
     tldr_lang = query.get("tldr_language", "Chinese")
     tldr_max_words = int(query.get("tldr_max_words", 80))
-    results: List[Dict] = []
-    for paper in papers:
-        enriched = {**paper}
-        if include_abstract and translate_abstract and paper.get("abstract"):
-            enriched["abstract_zh"] = scorer.translate(paper["abstract"], target_lang="Chinese")
-        if include_tldr:
-            enriched["tldr"] = scorer.summarize(
-                title=paper.get("title", ""),
-                abstract=paper.get("abstract", ""),
-                target_lang=tldr_lang,
-                max_words=tldr_max_words,
+    if scorer.is_local:
+        # Let a local server see every request at once so it can batch them on the GPU.
+        max_concurrency = max(max_concurrency, 2 * len(papers))
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _limited(coro):
+        async with sem:
+            return await coro
+
+    async def _enrich_one(paper: Dict) -> Dict:
+        title = paper.get("title", "")
+        abstract = paper.get("abstract", "")
+        # Abstracts already in Chinese need no translation; nothing to summarize without an abstract.
+        translate = include_abstract and translate_abstract and bool(abstract) and not _is_cjk(abstract)
+        summarize = include_tldr and bool(abstract)
+        if translate and summarize:
+            # One JSON-mode call returns both the translation and the TLDR.
+            extra = await _limited(
+                scorer.atranslate_and_summarize(
+                    title=title,
+                    abstract=abstract,
+                    target_lang="Chinese",
+                    tldr_lang=tldr_lang,
+                    max_words=tldr_max_words,
+                )
+            )
+            return {**paper, **extra}
+
+        calls = {}
+        if translate:
+            calls["abstract_zh"] = _limited(scorer.atranslate(abstract, target_lang="Chinese"))
+        if summarize:
+            calls["tldr"] = _limited(
+                scorer.asummarize(
+                    title=title,
+                    abstract=abstract,
+                    target_lang=tldr_lang,
+                    max_words=tldr_max_words,
+                )
             )
-        results.append(enriched)
-    return results
+        values = await asyncio.gather(*calls.values())
+        enriched = {**paper, **dict(zip(calls, values))}
+        if include_tldr:
+            enriched.setdefault("tldr", "")
+        return enriched
+
+    # The async client lives for this run only, so every `asyncio.run` gets one bound to its own loop.
+    async with scorer.async_session():
+        return list(await asyncio.gather(*[_enrich_one(p) for p in papers]))
 
 
 def main():
     config = load_config()
 
-    print("Loading Zotero papers...")
-    max_items = config["zotero"].get("max_items")
-    if max_items is not None:
-        max_items = int(max_items)
-    zotero_papers = fetch_papers(
-        library_id=config["zotero"]["library_id"],
-        api_key=config["zotero"]["api_key"],
-        library_type=config["zotero"]["library_type"],
-        item_types=config["zotero"]["item_types"],
-        max_items=max_items,
-    )
+    # Zotero, arXiv and the embedding model are independent until rerank, so load them concurrently.
+    print("Loading Zotero papers, arXiv daily papers and the embedding model...")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        model_future = executor.submit(load_model, config["embedding"]["model"])
+        zotero_future = executor.submit(load_zotero_corpus, config, model_future.result)
+        arxiv_future = executor.submit(
+            fetch_daily_arxiv,
+            arxiv_query=config["arxiv"]["query"],
+            max_results=int(config["arxiv"].get("max_results", 30)),
+            only_new=bool(config["arxiv"].get("only_new", True)),
+            days_back=float(config["arxiv"].get("days_back", 1)),
+            source=str(config["arxiv"].get("source", "rss")).lower(),
+            rss_wait_minutes=int(config["arxiv"].get("rss_wait_minutes", 30))
+            if config["arxiv"].get("rss_wait_minutes") is not None
+            else None,
+            rss_retry_minutes=int(config["arxiv"].get("rss_retry_minutes", 15)),
+        )
+        zotero_papers, corpus_emb = zotero_future.result()
+        arxiv_papers = arxiv_future.result()
+        model = model_future.result()
     print(f"Fetched {len(zotero_papers)} papers with abstracts from Zotero.")
-
-    print("Fetching arXiv daily papers...")
-    arxiv_papers = fetch_daily_arxiv(
-        arxiv_query=config["arxiv"]["query"],
-        max_results=int(config["arxiv"].get("max_results", 30)),
-        only_new=bool(config["arxiv"].get("only_new", True)),
-        days_back=float(config["arxiv"].get("days_back", 1)),
-        source=str(config["arxiv"].get("source", "rss")).lower(),
-        rss_wait_minutes=int(config["arxiv"].get("rss_wait_minutes", 30))
-        if config["arxiv"].get("rss_wait_minutes") is not None
-        else None,
-        rss_retry_minutes=int(config["arxiv"].get("rss_retry_minutes", 15)),
-    )
     print(f"Fetched {len(arxiv_papers)} arXiv candidates.")
     if not arxiv_papers:
         print("No new arXiv papers. Exit.")
@@ -155,6 +332,8 @@ def main():
         model_name=config["embedding"]["model"],
         top_k=int(config["query"].get("max_results", 5)),
         max_corpus=int(config["query"].get("max_corpus", 400)) if config["query"].get("max_corpus") else None,
+        corpus_emb=corpus_emb,
+        preloaded_model=model,
     )
     print(f"Top {len(ranked)} matched papers after rerank.")
     if not ranked:
@@ -168,7 +347,12 @@ def main():
         temperature=float(config["llm"].get("temperature", 0.0)),
     )
 
-    matches = enrich_with_llm(ranked, scorer, config["query"])
+    matches = enrich_with_llm(
+        ranked,
+        scorer,
+        config["query"],
+        max_concurrency=int(config["llm"].get("max_concurrency", 12)),
+    )
     print(f"Enriched {len(matches)} matched papers.")
 
     # 根据配置选择发送到飞书或企业微信
@@ -202,4 +386,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # Show the wechat push log on the console alongside the print output,
+    # without turning on INFO chatter from httpx/arxiv.
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("wechat").setLevel(logging.INFO)
     main()
@@ -1,32 +1,51 @@
-from typing import Dict, List, Sequence
+from typing import Dict, List, Optional, Sequence
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 
-def _encode_texts(model_name: str, texts: Sequence[str]) -> np.ndarray:
-    model = SentenceTransformer(model_name)
+def load_model(model_name: str) -> SentenceTransformer:
+    return SentenceTransformer(model_name)
+
+
+def _encode_texts(model: SentenceTransformer, texts: Sequence[str]) -> np.ndarray:
     embeddings = model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
     return embeddings
 
 
+def encode_abstracts(
+    model_name: str, papers: Sequence[Dict], model: Optional[SentenceTransformer] = None
+) -> np.ndarray:
+    if model is None:
+        model = load_model(model_name)
+    return _encode_texts(model, [p["abstract"] for p in papers])
+
+
 def rerank_by_embedding(
     candidates: List[Dict],
     corpus: List[Dict],
     model_name: str,
     top_k: int,
     max_corpus: int = None,
+    corpus_emb: Optional[np.ndarray] = None,
+    preloaded_model: Optional[SentenceTransformer] = None,
 ) -> List[Dict]:
     """
     Rerank candidate papers by cosine similarity to Zotero corpus abstracts.
+    Pass `corpus_emb` (rows aligned with `corpus`) to skip re-encoding the corpus,
+    and `preloaded_model` to skip loading the embedding model.
     """
     if max_corpus:
         corpus = corpus[:max_corpus]
+        if corpus_emb is not None:
+            corpus_emb = corpus_emb[:max_corpus]
     if not corpus or not candidates:
         return []
 
-    corpus_emb = _encode_texts(model_name, [p["abstract"] for p in corpus])
-    cand_emb = _encode_texts(model_name, [p["abstract"] for p in candidates])
+    model = preloaded_model if preloaded_model is not None else load_model(model_name)
+    if corpus_emb is None:
+        corpus_emb = encode_abstracts(model_name, corpus, model=model)
+    cand_emb = encode_abstracts(model_name, candidates, model=model)
 
     scores = cand_emb @ corpus_emb.T  # cosine because normalized
     avg_scores = scores.mean(axis=1)
@@ -64,7 +64,12 @@ def run(send: bool, limit: int = None):
         model=cfg["llm"]["model"],
         temperature=float(cfg["llm"].get("temperature", 0.0)),
     )
-    matches = enrich_with_llm(ranked, scorer, cfg["query"])
+    matches = enrich_with_llm(
+        ranked,
+        scorer,
+        cfg["query"],
+        max_concurrency=int(cfg["llm"].get("max_concurrency", 12)),
+    )
 
     print("\nTop matches:")
     for idx, p in enumerate(matches, 1):
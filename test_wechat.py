@@ -6,6 +6,10 @@ import sys
 import requests
 import json
 
+# 复用同一个会话，多次测试请求共享 TCP/TLS 连接
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+
 def test_wechat_webhook(webhook_url: str, test_content: str = None):
     """测试企业微信Webhook
     
@@ -47,9 +51,8 @@ def test_wechat_webhook(webhook_url: str, test_content: str = None):
     
     # 发送请求
     try:
-        headers = {"Content-Type": "application/json"}
         print(f"正在发送到: {webhook_url[:50]}...")
-        response = requests.post(webhook_url, json=payload, headers=headers, timeout=10)
+        response = _SESSION.post(webhook_url, json=payload, timeout=10)
         
         print(f"HTTP状态码: {response.status_code}")
         print(f"响应内容: {response.text}")
@@ -100,8 +103,7 @@ def test_different_lengths(webhook_url: str):
         }
         
         try:
-            headers = {"Content-Type": "application/json"}
-            response = requests.post(webhook_url, json=payload, headers=headers, timeout=10)
+            response = _SESSION.post(webhook_url, json=payload, timeout=10)
             
             if response.status_code == 200:
                 result = response.json()
@@ -140,8 +142,7 @@ def test_exact_length(webhook_url: str):
         }
         
         try:
-            headers = {"Content-Type": "application/json"}
-            response = requests.post(webhook_url, json=payload, headers=headers, timeout=10)
+            response = _SESSION.post(webhook_url, json=payload, timeout=10)
             
             if response.status_code == 200:
                 result = response.json()
@@ -1,55 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
-from datetime import datetime
-import requests
+from datetime import date
+from functools import lru_cache
+import json
+import logging
+import threading
+import time
+import urllib3
+
+
+_log = logging.getLogger(__name__)
+
+# 直接使用 urllib3 连接池：逐条推送时共享 TCP/TLS 连接，且省去 requests 的会话/适配器开销
+_POOL = urllib3.PoolManager(maxsize=10)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# 星级只有 6 种可能结果（N/A 与 1~5 星），直接查表
+_STAR_TABLE = ("N/A", "⭐", "⭐⭐", "⭐⭐⭐", "⭐⭐⭐⭐", "⭐⭐⭐⭐⭐")
+
+
+# 分条推送时论文之间的分隔符（纯 ASCII，字符数即字节数）
+_SEPARATOR = "\n\n---\n\n"
+_SEPARATOR_LEN = len(_SEPARATOR)
+
+# 摘要消息与分条推送首条消息的固定模板
+_GREETING = "ฅʕ•̫͡•ʔฅ ◔.̮◔✧ (•̀ᴗ• ) ArXiv 小助手来啦！"
+_SUMMARY_TMPL = (
+    "# {title}\n\n" + _GREETING + "\n\n"
+    "📅 **日期:** {date_str}\n"
+    "📚 **找到论文:** {total} 篇\n\n"
+    "接下来将逐条推送每篇论文的详细信息..."
+)
+_HEADER_TMPL = "# {title}\n\n" + _GREETING + "{date_str} 找到 **{total}** 📚 篇论文：\n\n"
 
 
 def _score_to_stars(score: float) -> str:
     """将相似度分数转换为星级显示"""
     if score is None:
-        return "N/A"
-    level = max(1, min(5, int(round(score * 5))))
-    return "⭐" * level
+        return _STAR_TABLE[0]
+    return _STAR_TABLE[max(1, min(5, int(round(score * 5))))]
+
+
+@lru_cache(maxsize=2)
+def _today_cn(ordinal: int) -> str:
+    d = date.fromordinal(ordinal)
+    return f"{d.year}年{d.month:02d}月{d.day:02d}日"
+
+
+def _date_str() -> str:
+    """当天日期（如 2024年01月01日），同一天内只格式化一次"""
+    return _today_cn(date.today().toordinal())
 
 
 def _short_link(url: str) -> str:
     """简化链接显示"""
     if not url:
         return ""
-    link = url.replace("https://", "").replace("http://", "")
-    return link.rstrip("/")
+    return url.removeprefix("https://").removeprefix("http://").rstrip("/")
 
 
-def _paper_md(idx: int, paper: Dict[str, str], max_abstract_length: int = 500) -> str:
-    """将单篇论文转换为Markdown格式"""
-    title = paper.get("title", "Untitled")
-    # 限制标题长度，避免过长
-    if len(title) > 200:
-        title = title[:200] + "..."
+def _clip(text: str, limit: int) -> str:
+    """超过 limit 字符时截断并追加省略号"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _utf8_len(text: str) -> int:
+    """企业微信按 UTF-8 字节数限制消息长度（中文字符占 3 字节）"""
+    return len(text.encode("utf-8"))
+
+
+def _clip_bytes(text: str, limit: int) -> str:
+    """按 UTF-8 字节数截断，不切断多字节字符"""
+    return text.encode("utf-8")[:limit].decode("utf-8", "ignore")
+
+
+def _paper_md_lines(idx: int, paper: Dict[str, str], max_abstract_length: int = 500) -> List[str]:
+    """将单篇论文转换为Markdown行列表，由调用方统一 join"""
+    title = _clip(paper.get("title", "Untitled"), 200)  # 限制标题长度，避免过长
     
-    link = paper.get("link") or paper.get("url")
+    link = paper.get("link") or paper.get("url") or ""
     score = paper.get("score")
     score_text = f"{score:.2f}" if isinstance(score, (int, float)) else "N/A"
     stars = _score_to_stars(score if isinstance(score, (int, float)) else None)
-    abstract = paper.get("abstract") or ""
-    abstract_zh = paper.get("abstract_zh") or ""
-    tldr = paper.get("tldr") or ""
-    authors = paper.get("authors") or []
-    tags = paper.get("tags") or []
+    abstract = paper.get("abstract", "")
+    abstract_zh = paper.get("abstract_zh", "")
+    tldr = paper.get("tldr", "")
+    authors = paper.get("authors", ()) or ()
+    tags = paper.get("tags", ()) or ()
     
-    # 限制关键词数量
-    keywords = ", ".join(tags[:4])  # 减少到4个关键词
-    if len(keywords) > 150:  # 限制关键词总长度
-        keywords = keywords[:150] + "..."
+    # 限制关键词数量（4个）与总长度
+    keywords = _clip(", ".join(tags[:4]), 150)
     
     # 限制作者数量
     if authors:
         if len(authors) <= 3:
             author_line = ", ".join(authors)
         else:
-            author_line = ", ".join(authors[:2] + ["...", authors[-1]])
+            author_line = ", ".join([*authors[:2], "...", authors[-1]])
         # 限制作者行长度
-        if len(author_line) > 200:
-            author_line = author_line[:200] + "..."
+        author_line = _clip(author_line, 200)
     else:
         author_line = ""
     link_text = _short_link(link)
@@ -65,8 +114,7 @@ def _paper_md(idx: int, paper: Dict[str, str], max_abstract_length: int = 500) -
     score_line = f"{stars} 相关度: {score_text}"
     if link_text:
         # 限制链接文本长度
-        if len(link_text) > 50:
-            link_text = link_text[:50] + "..."
+        link_text = _clip(link_text, 50)
         score_line += f" | [{link_text}]({link})"
     lines.append(score_line)
     
@@ -80,20 +128,21 @@ def _paper_md(idx: int, paper: Dict[str, str], max_abstract_length: int = 500) -
     
     # TLDR或摘要（限制长度以避免单条消息过长）
     if tldr:
-        tldr_text = tldr.replace('TLDR: ', '')
-        if len(tldr_text) > max_abstract_length:
-            tldr_text = tldr_text[:max_abstract_length] + "..."
+        tldr_text = _clip(tldr.replace('TLDR: ', ''), max_abstract_length)
         lines.append(f"**TLDR:** {tldr_text}")
     elif abstract_zh:
-        if len(abstract_zh) > max_abstract_length:
-            abstract_zh = abstract_zh[:max_abstract_length] + "..."
+        abstract_zh = _clip(abstract_zh, max_abstract_length)
         lines.append(f"**摘要(中文):** {abstract_zh}")
     elif abstract:
-        if len(abstract) > max_abstract_length:
-            abstract = abstract[:max_abstract_length] + "..."
+        abstract = _clip(abstract, max_abstract_length)
         lines.append(f"**摘要:** {abstract}")
     
-    return "\n".join(lines)
+    return lines
+
+
+def _paper_md(idx: int, paper: Dict[str, str], max_abstract_length: int = 500) -> str:
+    """将单篇论文转换为Markdown格式"""
+    return "\n".join(_paper_md_lines(idx, paper, max_abstract_length))
 
 
 def build_wechat_markdown(
@@ -103,13 +152,13 @@ def build_wechat_markdown(
 ) -> Dict:
     """构建企业微信Markdown格式的消息内容（已废弃，保留用于兼容）"""
     total = len(papers)
-    date_str = datetime.now().strftime('%Y年%m月%d日')
+    date_str = _date_str()
     
     # 构建Markdown内容
     content_parts = [
         f"# {title}",
         "",
-        f"ฅʕ•̫͡•ʔฅ ◔.̮◔✧ (•̀ᴗ• ) ArXiv 小助手来啦！{date_str} 找到 **{total}** 📚 篇论文：",
+        f"{_GREETING}{date_str} 找到 **{total}** 📚 篇论文：",
         "",
     ]
     
@@ -118,12 +167,11 @@ def build_wechat_markdown(
     else:
         content_parts.append("---")
         content_parts.append("")
+        # 各论文的行直接并入同一列表，最后只做一次 join
         for idx, paper in enumerate(papers, 1):
-            content_parts.append(_paper_md(idx, paper))
+            content_parts.extend(_paper_md_lines(idx, paper))
             if idx < total:
-                content_parts.append("")
-                content_parts.append("---")
-                content_parts.append("")
+                content_parts.extend(("", "---", ""))
     
     markdown_content = "\n".join(content_parts)
     
@@ -143,36 +191,25 @@ def build_single_paper_message(
 ) -> Dict:
     """构建单篇论文的企业微信Markdown消息
     
-    企业微信Markdown消息最大长度为4096字符，需要严格控制。
+    企业微信Markdown消息最大长度为4096字节（UTF-8），需要严格控制。
     """
-    MAX_LENGTH = 4096
-    date_str = datetime.now().strftime('%Y年%m月%d日')
+    MAX_LENGTH = 4096  # UTF-8 字节数
+    date_str = _date_str()
     
     # 构建头部（预留一些空间）
     header = f"# {title}\n\n📚 **第 {idx}/{total} 篇** | {date_str}\n\n"
-    header_length = len(header)
+    header_length = _utf8_len(header)
     
-    # 计算可用空间（预留50字符作为安全边界）
-    available_length = MAX_LENGTH - header_length - 50
-    
-    # 逐步尝试不同的摘要长度
-    for max_abstract_len in [600, 400, 250, 150, 100]:
-        paper_content = _paper_md(idx, paper, max_abstract_length=max_abstract_len)
-        markdown_content = header + paper_content
-        
-        if len(markdown_content) <= MAX_LENGTH:
-            break
-    else:
-        # 如果所有尝试都失败，强制截断
-        paper_content = _paper_md(idx, paper, max_abstract_length=100)
-        markdown_content = header + paper_content
-        if len(markdown_content) > MAX_LENGTH:
-            # 最后的安全措施：直接截断整个内容
-            markdown_content = markdown_content[:MAX_LENGTH - 20] + "\n\n*（内容过长已截断）*"
+    # 先不带摘要渲染一次，得到固定开销（按 UTF-8 字节计）；剩余字节（预留50字节作为安全边界）全部留给摘要。
+    # 摘要按字符截断，按中文每字 3 字节折算为字符数，限制在 100~600 字符
+    base_length = _utf8_len(_paper_md(idx, paper, max_abstract_length=0))
+    budget = (MAX_LENGTH - header_length - base_length - 50) // 3
+    paper_content = _paper_md(idx, paper, max_abstract_length=max(100, min(600, budget)))
+    markdown_content = header + paper_content
     
-    # 最终验证
-    if len(markdown_content) > MAX_LENGTH:
-        markdown_content = markdown_content[:MAX_LENGTH - 20] + "\n\n*（内容过长已截断）*"
+    # 最终验证（截断标记本身占 31 字节）
+    if _utf8_len(markdown_content) > MAX_LENGTH:
+        markdown_content = _clip_bytes(markdown_content, MAX_LENGTH - 40) + "\n\n*（内容过长已截断）*"
     
     return {
         "msgtype": "markdown",
@@ -194,15 +231,7 @@ def build_summary_message(
         total: 论文总数
         mentioned_list: 需要@的用户ID列表，支持 ["@all"] 或具体的UserID列表
     """
-    date_str = datetime.now().strftime('%Y年%m月%d日')
-    
-    markdown_content = (
-        f"# {title}\n\n"
-        f"ฅʕ•̫͡•ʔฅ ◔.̮◔✧ (•̀ᴗ• ) ArXiv 小助手来啦！\n\n"
-        f"📅 **日期:** {date_str}\n"
-        f"📚 **找到论文:** {total} 篇\n\n"
-        f"接下来将逐条推送每篇论文的详细信息..."
-    )
+    markdown_content = _SUMMARY_TMPL.format(title=title, date_str=_date_str(), total=total)
     
     # 添加@用户标签（Markdown格式需要在内容中使用 <@userid> 语法）
     if mentioned_list:
@@ -225,17 +254,25 @@ def build_summary_message(
 
 def post_to_wechat(webhook_url: str, payload: Dict) -> None:
     """发送消息到企业微信Webhook"""
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(webhook_url, json=payload, headers=headers, timeout=10)
+    post_to_wechat_raw(webhook_url, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def post_to_wechat_raw(webhook_url: str, body: bytes) -> None:
+    """发送已序列化好的 JSON 请求体（UTF-8 字节）到企业微信Webhook"""
+    response = _POOL.request("POST", webhook_url, body=body, headers=_JSON_HEADERS, timeout=10.0)
+    data = response.data
     
-    if response.status_code != 200:
+    if response.status != 200:
         raise RuntimeError(
-            f"企业微信Webhook请求失败: HTTP {response.status_code} {response.text}"
+            f"企业微信Webhook请求失败: HTTP {response.status} {data.decode('utf-8', 'replace')}"
         )
     
     # 企业微信返回格式: {"errcode": 0, "errmsg": "ok"}
+    # 成功响应的字节前缀固定，直接比对即可跳过 JSON 解析；其余情况再走完整解析
+    if data.startswith(b'{"errcode":0,'):
+        return
     try:
-        result = response.json()
+        result = json.loads(data)
         if result.get("errcode") != 0:
             raise RuntimeError(
                 f"企业微信Webhook返回错误: errcode={result.get('errcode')}, errmsg={result.get('errmsg')}"
@@ -243,7 +280,7 @@ def post_to_wechat(webhook_url: str, payload: Dict) -> None:
     except ValueError:
         # 如果响应不是JSON，使用原始文本
         raise RuntimeError(
-            f"企业微信Webhook返回非JSON格式: {response.text}"
+            f"企业微信Webhook返回非JSON格式: {data.decode('utf-8', 'replace')}"
         )
 
 
@@ -253,27 +290,26 @@ def post_papers_separately(
     papers: List[Dict[str, str]],
     delay_seconds: float = 0.5,
     mentioned_list: List[str] = None,
+    max_workers: int = 1,
 ) -> None:
-    """将论文按1000字符长度分成多条消息推送
+    """将论文按长度（不超过3900字节）分成多条消息推送
     
     Args:
         webhook_url: 企业微信Webhook URL
         title: 消息标题
         papers: 论文列表
-        delay_seconds: 每条消息之间的延迟（秒），避免发送过快
+        delay_seconds: 相邻两条消息开始发送的最小间隔（秒），避免发送过快；请求本身的耗时计入间隔
         mentioned_list: 需要@的用户ID列表，支持 ["@all"] 或具体的UserID列表，只在第一条消息中@
+        max_workers: 并发发送的线程数；默认 1 逐条发送以保证消息顺序，大于 1 时更快但消息可能乱序到达
     """
-    import time
-    
-    MAX_MESSAGE_LENGTH = 1000  # 每条消息最大长度（留3096字符安全边界，确保不超过4096）
+    MAX_MESSAGE_LENGTH = 3900  # 每条消息最大 UTF-8 字节数（接口上限 4096 字节，留出安全边界）
     total = len(papers)
-    date_str = datetime.now().strftime('%Y年%m月%d日')
     
     if total == 0:
         # 如果没有论文，发送一条提示消息
         payload = build_summary_message(title, 0, mentioned_list=mentioned_list)
         post_to_wechat(webhook_url, payload)
-        print("Sent summary message (no papers) to WeChat Work webhook.")
+        _log.info("Sent summary message (no papers) to WeChat Work webhook.")
         return
     
     # 构建所有论文的内容
@@ -288,7 +324,7 @@ def post_papers_separately(
     current_length = 0
     
     # 第一条消息的头部（包含@用户）
-    header = f"# {title}\n\nฅʕ•̫͡•ʔฅ ◔.̮◔✧ (•̀ᴗ• ) ArXiv 小助手来啦！{date_str} 找到 **{total}** 📚 篇论文：\n\n"
+    header = _HEADER_TMPL.format(title=title, date_str=_date_str(), total=total)
     
     # 在第一条消息中添加@用户标签
     if mentioned_list:
@@ -302,89 +338,89 @@ def post_papers_separately(
             header += " ".join(at_tags) + "\n\n"
     
     header += "---\n\n"
-    header_length = len(header)
+    header_length = _utf8_len(header)
     current_length = header_length
     current_message_parts = [header]
     
-    for idx, paper_content in enumerate(paper_contents, 1):
-        separator = "\n\n---\n\n"
-        paper_with_separator = paper_content + separator
-        paper_length = len(paper_with_separator)
+    # 论文内容与分隔符分别入列，刷新时弹出末尾的分隔符即可（无需切片）
+    for paper_content in paper_contents:
+        paper_length = _utf8_len(paper_content) + _SEPARATOR_LEN
         
         # 检查添加这篇论文后是否会超过长度限制
         if current_length + paper_length > MAX_MESSAGE_LENGTH:
             # 如果当前消息已经有内容（除了header），先保存当前消息
             if len(current_message_parts) > 1:
-                # 移除最后的分隔符
-                last_part = current_message_parts[-1]
-                if last_part.endswith(separator):
-                    current_message_parts[-1] = last_part[:-len(separator)]
-                final_message = "".join(current_message_parts)
-                # 再次检查长度
-                if len(final_message) > MAX_MESSAGE_LENGTH:
-                    final_message = final_message[:MAX_MESSAGE_LENGTH - 20] + "\n\n*（内容过长已截断）*"
-                messages.append(final_message)
+                current_message_parts.pop()  # 移除最后的分隔符
+                messages.append("".join(current_message_parts))
             
             # 开始新消息（如果单篇论文就超过限制，需要截断）
             if paper_length > MAX_MESSAGE_LENGTH:
                 # 单篇论文太长，需要截断
-                truncated = paper_content[:MAX_MESSAGE_LENGTH - 50] + "\n\n*（内容过长已截断）*"
-                current_message_parts = [truncated]
-                current_length = len(truncated)
+                paper_content = _clip_bytes(paper_content, MAX_MESSAGE_LENGTH - 50) + "\n\n*（内容过长已截断）*"
+                paper_length = _utf8_len(paper_content) + _SEPARATOR_LEN
+                current_message_parts = []
+                current_length = 0
             else:
                 # 开始新消息，添加简短的头部
                 new_header = f"# {title} (续)\n\n"
-                current_message_parts = [new_header, paper_with_separator]
-                current_length = len(new_header) + paper_length
-        else:
-            # 可以添加到当前消息
-            current_message_parts.append(paper_with_separator)
-            current_length += paper_length
+                current_message_parts = [new_header]
+                current_length = _utf8_len(new_header)
+        
+        current_message_parts.append(paper_content)
+        current_message_parts.append(_SEPARATOR)
+        current_length += paper_length
     
     # 添加最后一条消息
-    if current_message_parts:
-        # 移除最后的分隔符
-        last_part = current_message_parts[-1]
-        if last_part.endswith(separator):
-            current_message_parts[-1] = last_part[:-len(separator)]
-        final_message = "".join(current_message_parts)
-        # 再次检查长度
-        if len(final_message) > MAX_MESSAGE_LENGTH:
-            final_message = final_message[:MAX_MESSAGE_LENGTH - 20] + "\n\n*（内容过长已截断）*"
-        messages.append(final_message)
+    if len(current_message_parts) > 1:
+        current_message_parts.pop()  # 移除最后的分隔符
+        messages.append("".join(current_message_parts))
     
     # 发送所有消息
     total_messages = len(messages)
     for msg_idx, message_content in enumerate(messages, 1):
-        try:
-            # 最终严格长度检查（确保不超过4096）
-            actual_length = len(message_content)
-            if actual_length > 4096:
-                print(f"警告: 消息 {msg_idx} 长度 {actual_length} 超过4096，正在截断...")
-                message_content = message_content[:4050] + "\n\n*（内容过长已截断）*"
-                actual_length = len(message_content)
-            
-            # 再次验证
-            if actual_length > 4096:
-                print(f"错误: 消息 {msg_idx} 截断后仍超过4096字符: {actual_length}")
-                message_content = message_content[:4090] + "..."
-            
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "content": message_content
-                }
-            }
-            post_to_wechat(webhook_url, payload)
-            print(f"✅ Sent message {msg_idx}/{total_messages} to WeChat Work webhook (length: {len(message_content)} chars)")
-            
-            # 在消息之间添加延迟，避免发送过快
-            if msg_idx < total_messages and delay_seconds > 0:
-                time.sleep(delay_seconds)
-        except Exception as e:
-            print(f"❌ Failed to send message {msg_idx}/{total_messages}: {e}")
-            print(f"   消息长度: {len(message_content)} 字符")
-            # 继续发送其他消息，不中断整个流程
-            continue
-    
-    print(f"Finished sending all {total_messages} messages ({total} papers) to WeChat Work webhook.")
+        # 分割时已按 MAX_MESSAGE_LENGTH 控制长度，这里只是兜底（确保不超过4096字节）
+        actual_length = _utf8_len(message_content)
+        if actual_length > 4096:
+            _log.warning("警告: 消息 %d 长度 %d 字节超过4096，正在截断...", msg_idx, actual_length)
+            messages[msg_idx - 1] = _clip_bytes(message_content, 4050) + "\n\n*（内容过长已截断）*"
+    
+    # 请求体提前一次性序列化为字节；ensure_ascii=False 让中文按 UTF-8 发送（3 字节，而非 6 字节的 \uXXXX 转义）
+    bodies = [
+        json.dumps(
+            {"msgtype": "markdown", "markdown": {"content": message_content}},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        for message_content in messages
+    ]
+    
+    pace_lock = threading.Lock()
+    next_send = time.monotonic()
+
+    def send(body: bytes) -> None:
+        nonlocal next_send
+        # 只等待距离上次发送剩余的时间，上一条请求已耗去的时间不再重复等待；
+        # 加锁保证多线程时各请求的开始时刻仍至少间隔 delay_seconds
+        with pace_lock:
+            wait = next_send - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            next_send = time.monotonic() + delay_seconds
+        post_to_wechat_raw(webhook_url, body)
+    
+    # 按顺序提交、按顺序收集结果；max_workers=1 时逐条发送，群内消息顺序与列表一致
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(send, body) for body in bodies]
+        for msg_idx, (future, message_content) in enumerate(zip(futures, messages), 1):
+            try:
+                future.result()
+                _log.info(
+                    "✅ Sent message %d/%d to WeChat Work webhook (length: %d bytes)",
+                    msg_idx, total_messages, _utf8_len(message_content),
+                )
+            except Exception as e:
+                _log.error("❌ Failed to send message %d/%d: %s", msg_idx, total_messages, e)
+                _log.error("   消息长度: %d 字节", _utf8_len(message_content))
+                # 继续发送其他消息，不中断整个流程
+                continue
+    
+    _log.info("Finished sending all %d messages (%d papers) to WeChat Work webhook.", total_messages, total)
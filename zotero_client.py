@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from pyzotero import zotero
 
@@ -16,15 +16,69 @@ def _build_link(data: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def _normalize_item(entry: Dict[str, Any], collection_map: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    data = entry.get("data", {})
+    abstract = (data.get("abstractNote") or "").strip()
+    title = (data.get("title") or "").strip()
+    if not abstract or not title:
+        return None
+
+    collections = [collection_map.get(key, key) for key in data.get("collections", [])]
+    tags = [t.get("tag") for t in data.get("tags", []) if t.get("tag")]
+    authors = []
+    for creator in data.get("creators", []):
+        name = creator.get("name")
+        if not name:
+            first = creator.get("firstName") or ""
+            last = creator.get("lastName") or ""
+            name = f"{first} {last}".strip()
+        if name:
+            authors.append(name)
+
+    return {
+        "key": entry.get("key") or data.get("key"),
+        "title": title,
+        "abstract": abstract,
+        "collections": collections,
+        "tags": tags,
+        "authors": authors,
+        "link": _build_link(data),
+        "date_added": data.get("dateAdded", ""),
+    }
+
+
+def library_version(library_id: str, api_key: str, library_type: str = "user") -> int:
+    """
+    Return the library's current `Last-Modified-Version` (one cheap request).
+    """
+    client = zotero.Zotero(library_id, library_type, api_key)
+    return int(client.last_modified_version())
+
+
+def changed_item_keys(library_id: str, api_key: str, since: int, library_type: str = "user") -> Set[str]:
+    """
+    Keys of items modified, trashed or deleted after library version `since`.
+    """
+    client = zotero.Zotero(library_id, library_type, api_key)
+    # /items leaves out trashed items unless asked; moving an item to the trash bumps its
+    # version, so including them marks it as changed (and it is absent from the delta).
+    changed = set(client.item_versions(since=since, includeTrashed=1))
+    deleted = client.deleted(since=since) or {}
+    changed.update(deleted.get("items", []))
+    return changed
+
+
 def fetch_papers(
     library_id: str,
     api_key: str,
     library_type: str = "user",
     item_types: Optional[List[str]] = None,
     max_items: Optional[int] = None,
+    since: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Fetch papers from Zotero and normalize the fields we need.
+    With `since`, only items modified after that library version are returned.
     """
     if item_types is None:
         item_types = ["conferencePaper", "journalArticle", "preprint"]
@@ -34,6 +88,8 @@ def fetch_papers(
     type_filter = " || ".join(item_types)
     # Sort by latest added first so we match against newest Zotero entries.
     items_kwargs = dict(itemType=type_filter, sort="dateAdded", direction="desc")
+    if since is not None:
+        items_kwargs["since"] = since
     if max_items:
         raw_items = client.items(limit=max_items, **items_kwargs)
     else:
@@ -41,32 +97,9 @@ def fetch_papers(
     papers: List[Dict[str, Any]] = []
 
     for entry in raw_items:
-        data = entry.get("data", {})
-        abstract = (data.get("abstractNote") or "").strip()
-        title = (data.get("title") or "").strip()
-        if not abstract or not title:
+        paper = _normalize_item(entry, collection_map)
+        if paper is None:
             continue
-
-        collections = [collection_map.get(key, key) for key in data.get("collections", [])]
-        tags = [t.get("tag") for t in data.get("tags", []) if t.get("tag")]
-        authors = []
-        for creator in data.get("creators", []):
-            name = creator.get("name")
-            if not name:
-                first = creator.get("firstName") or ""
-                last = creator.get("lastName") or ""
-                name = f"{first} {last}".strip()
-            if name:
-                authors.append(name)
-
-        paper = {
-            "title": title,
-            "abstract": abstract,
-            "collections": collections,
-            "tags": tags,
-            "authors": authors,
-            "link": _build_link(data),
-        }
         papers.append(paper)
         if max_items and len(papers) >= max_items:
             break